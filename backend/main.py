@@ -1,22 +1,37 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict, Any
-from datetime import datetime, date
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Dict, Any, Annotated
+from datetime import datetime, date, timedelta
+import calendar
 import google.generativeai as genai
+from google.api_core.exceptions import ResourceExhausted, ServerError
 import os
 from enum import Enum
 import json
+import math
 import sqlite3
-from contextlib import contextmanager
+import queue
+import threading
+import hashlib
+from contextlib import contextmanager, suppress
+from functools import lru_cache
 import logging
+import asyncio
+import time
+from collections import deque
+import anyio.to_thread
+from cachetools import TTLCache
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Initialize FastAPI app
-app = FastAPI(title="AI Personal Finance Tracker", version="1.0.0")
+app = FastAPI(title="AI Personal Finance Tracker", version="1.0.0", default_response_class=ORJSONResponse)
 
 # CORS middleware
 app.add_middleware(
@@ -27,16 +42,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress larger JSON payloads such as transaction lists and analytics
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # Configure Gemini API
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "your-gemini-api-key-here")
 genai.configure(api_key=GEMINI_API_KEY)
+GEMINI_MODEL_NAME = "gemini-pro"
+# Client-side quota: concurrent requests and prompt tokens per rolling minute
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "32000"))
+
+# Server setup. One worker per core, capped at the Gemini concurrency quota
+# because each worker needs at least one concurrent Gemini slot
+UVICORN_WORKERS = int(os.getenv("UVICORN_WORKERS", min(os.cpu_count() or 1, GEMINI_MAX_CONCURRENCY)))
+UVICORN_LOOP = os.getenv("UVICORN_LOOP", "auto")
+UVICORN_HTTP = os.getenv("UVICORN_HTTP", "auto")
+
+# Number of processes sharing the Gemini quota. Set by __main__ for the worker
+# processes it starts; any other launch (e.g. plain uvicorn) counts as one
+SERVER_PROCESSES = int(os.getenv("FINANCE_TRACKER_SERVER_PROCESSES", "1"))
+WORKER_GEMINI_MAX_CONCURRENCY = max(1, GEMINI_MAX_CONCURRENCY // SERVER_PROCESSES)
+WORKER_GEMINI_TOKENS_PER_MINUTE = max(1, GEMINI_TOKENS_PER_MINUTE // SERVER_PROCESSES)
+
+@lru_cache(maxsize=1)
+def get_gemini_model():
+    """Build the Gemini model handle once and reuse it for every request"""
+    return genai.GenerativeModel(GEMINI_MODEL_NAME)
 
 # Database setup
 DATABASE_PATH = "finance_tracker.db"
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+# Seconds a request waits for a free connection before failing
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Worker threads available to the sync (def) endpoints
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "64"))
+
+# Connection-level settings: WAL lets readers proceed during writes, NORMAL
+# synchronous only fsyncs at checkpoints, and the cache/mmap sizes keep
+# analytics reads in memory
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA mmap_size=268435456",
+)
+
+# Shared connections, created once on startup and reused across requests.
+# A None slot stands for a connection that was discarded and is reopened on
+# next checkout, so a failure never shrinks the pool
+db_pool: Optional[queue.Queue] = None
+db_pool_lock = threading.Lock()
+
+def apply_pragmas(conn: sqlite3.Connection):
+    """Apply performance PRAGMAs to a freshly opened connection"""
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
 
 def init_database():
     """Initialize SQLite database with tables"""
     conn = sqlite3.connect(DATABASE_PATH)
+    apply_pragmas(conn)
     cursor = conn.cursor()
     
     # Create transactions table
@@ -66,18 +133,132 @@ def init_database():
         )
     """)
     
+    # Create cache_generations table, bumped on every write to invalidate cached responses
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cache_generations (
+            user_id TEXT PRIMARY KEY,
+            generation INTEGER NOT NULL
+        )
+    """)
+    
+    # Indexes for per-user listing and date-range analytics
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tx_user_date
+        ON transactions(user_id, date DESC, created_at DESC)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_tx_user_type_date
+        ON transactions(user_id, type, date)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_bg_user_my
+        ON budget_goals(user_id, month, year)
+    """)
+    
     conn.commit()
     conn.close()
 
+def create_connection():
+    """Open a SQLite connection that can be shared across worker threads"""
+    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    apply_pragmas(conn)
+    return conn
+
+def init_db_pool(size: int = DB_POOL_SIZE):
+    """Fill the connection pool, unless it already exists"""
+    global db_pool
+    with db_pool_lock:
+        if db_pool is not None:
+            return
+        pool = queue.Queue(maxsize=size)
+        try:
+            for _ in range(size):
+                pool.put(create_connection())
+        except Exception:
+            while not pool.empty():
+                pool.get_nowait().close()
+            raise
+        db_pool = pool
+
+def close_db_pool():
+    """Close every idle pooled connection; checked-out ones are closed when returned"""
+    global db_pool
+    with db_pool_lock:
+        pool, db_pool = db_pool, None
+    if pool is None:
+        return
+    while not pool.empty():
+        conn = pool.get_nowait()
+        if conn is not None:
+            conn.close()
+
+def release_connection(pool: queue.Queue, conn: Optional[sqlite3.Connection]):
+    """Return a connection to its pool, or close it if that pool was shut down"""
+    with db_pool_lock:
+        if pool is db_pool:
+            pool.put(conn)
+            return
+    if conn is not None:
+        conn.close()
+
 @contextmanager
 def get_db():
-    """Database context manager"""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    """Database context manager that borrows a connection from the pool"""
+    if db_pool is None:
+        init_db_pool()
+    pool = db_pool
+    if pool is None:
+        raise RuntimeError("Database connection pool is closed")
+    try:
+        conn = pool.get(timeout=DB_POOL_TIMEOUT)
+    except queue.Empty:
+        raise RuntimeError("Timed out waiting for a database connection")
+    if conn is None:
+        try:
+            conn = create_connection()
+        except Exception:
+            release_connection(pool, None)
+            raise
     try:
         yield conn
     finally:
-        conn.close()
+        try:
+            # Discard anything left uncommitted before handing the connection back
+            conn.rollback()
+        except sqlite3.Error as e:
+            logger.error(f"Discarding database connection after failed rollback: {str(e)}")
+            with suppress(sqlite3.Error):
+                conn.close()
+            conn = None
+        finally:
+            release_connection(pool, conn)
+
+# Response caches
+# Summary and analytics keys include a per-user generation that is bumped in
+# the same transaction as every write, so stale entries are never served after
+# the data changes. The generation lives in SQLite so every uvicorn worker sees it
+summary_cache = TTLCache(maxsize=256, ttl=30)
+spending_trends_cache = TTLCache(maxsize=256, ttl=60)
+budget_performance_cache = TTLCache(maxsize=256, ttl=60)
+ai_advice_cache = TTLCache(maxsize=256, ttl=600)
+cache_lock = threading.Lock()
+
+def get_data_generation(user_id: str = "default_user") -> int:
+    """Current data generation for a user"""
+    with get_db() as conn:
+        row = conn.execute(SQL_SELECT_CACHE_GENERATION, (user_id,)).fetchone()
+    return row['generation'] if row else 0
+
+def cache_get(cache: TTLCache, key):
+    """Look up a cached value, returning None on a miss"""
+    with cache_lock:
+        return cache.get(key)
+
+def cache_set(cache: TTLCache, key, value):
+    """Store a value in a cache"""
+    with cache_lock:
+        cache[key] = value
 
 # Pydantic models
 class TransactionType(str, Enum):
@@ -106,8 +287,12 @@ class BudgetGoal(BaseModel):
     month: int
     year: int
 
+# Larger histories should be left out of the request and read server-side
+ADVICE_MAX_REQUEST_TRANSACTIONS = 1000
+
 class AIAdviceRequest(BaseModel):
-    transactions: List[Dict[str, Any]]
+    # Omit to base the advice on the stored transaction history
+    transactions: Optional[Annotated[List[Dict[str, Any]], Field(max_length=ADVICE_MAX_REQUEST_TRANSACTIONS)]] = None
     budget_goals: Optional[Dict[str, float]] = None
     user_context: Optional[str] = None
 
@@ -118,107 +303,344 @@ class FinancialSummary(BaseModel):
     expenses_by_category: Dict[str, float]
     savings_rate: float
 
+# Date range helpers
+def month_bounds(year: int, month: int):
+    """Return the first day of the month and the first day of the next month"""
+    start = date(year, month, 1)
+    end = date(year + (month == 12), month % 12 + 1, 1)
+    return start, end
+
+def months_ago(day: date, months: int) -> date:
+    """Shift a date back by whole months, clamping to the end of the month"""
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    return date(year, month, min(day.day, calendar.monthrange(year, month)[1]))
+
+# SQL statements
+# Built once at import so every call reuses the same text and hits
+# sqlite3's per-connection statement cache
+TRANSACTION_COLUMNS = ("id", "user_id", "type", "category", "amount", "description", "date", "created_at")
+BUDGET_GOAL_COLUMNS = ("id", "user_id", "category", "amount", "month", "year")
+
+SQL_INSERT_TRANSACTION = """
+    INSERT INTO transactions (user_id, type, category, amount, description, date)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+SQL_SELECT_TRANSACTIONS = """
+    SELECT {cols} FROM transactions
+    WHERE user_id = ?
+    ORDER BY date DESC, created_at DESC
+    LIMIT ?
+""".format(cols=", ".join(TRANSACTION_COLUMNS))
+
+SQL_DELETE_TRANSACTION = "DELETE FROM transactions WHERE id = ?"
+
+SQL_SELECT_BUDGET_GOALS = """
+    SELECT {cols} FROM budget_goals
+    WHERE user_id = ?
+""".format(cols=", ".join(BUDGET_GOAL_COLUMNS))
+
+SQL_SELECT_BUDGET_GOALS_FOR_MONTH = """
+    SELECT {cols} FROM budget_goals
+    WHERE user_id = ? AND month = ? AND year = ?
+""".format(cols=", ".join(BUDGET_GOAL_COLUMNS))
+
+SQL_UPSERT_BUDGET_GOAL = """
+    INSERT OR REPLACE INTO budget_goals (user_id, category, amount, month, year)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+SQL_SUMMARY_TOTALS = """
+    SELECT type, SUM(amount) as total
+    FROM (
+        SELECT type, amount FROM transactions
+        WHERE user_id = ?
+        ORDER BY date DESC, created_at DESC
+        LIMIT ?
+    )
+    GROUP BY type
+"""
+
+SQL_SUMMARY_EXPENSES_BY_CATEGORY = """
+    SELECT category, SUM(amount) as total
+    FROM (
+        SELECT type, category, amount FROM transactions
+        WHERE user_id = ?
+        ORDER BY date DESC, created_at DESC
+        LIMIT ?
+    )
+    WHERE type = 'expense'
+    GROUP BY category
+"""
+
+SQL_MONTHLY_TRENDS = """
+    SELECT
+        strftime('%Y-%m', date) as month,
+        SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
+        SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expenses
+    FROM transactions
+    WHERE user_id = ? AND date >= ?
+    GROUP BY strftime('%Y-%m', date)
+    ORDER BY month
+"""
+
+SQL_CATEGORY_TRENDS = """
+    SELECT
+        category,
+        SUM(amount) as total_amount,
+        COUNT(*) as transaction_count,
+        AVG(amount) as avg_amount
+    FROM transactions
+    WHERE user_id = ? AND type = 'expense' AND date >= ?
+    GROUP BY category
+    ORDER BY total_amount DESC
+"""
+
+SQL_DAILY_PATTERNS = """
+    SELECT
+        strftime('%w', date) as day_of_week,
+        AVG(amount) as avg_spending
+    FROM transactions
+    WHERE user_id = ? AND type = 'expense' AND date >= ?
+    GROUP BY strftime('%w', date)
+    ORDER BY day_of_week
+"""
+
+SQL_BUDGET_PERFORMANCE = """
+    WITH spent AS (
+        SELECT category, SUM(amount) as actual
+        FROM transactions
+        WHERE user_id = ?
+            AND type = 'expense'
+            AND date >= ?
+            AND date < ?
+        GROUP BY category
+    ),
+    goals AS (
+        SELECT category, amount
+        FROM budget_goals
+        WHERE user_id = ? AND month = ? AND year = ?
+    )
+    SELECT g.category, g.amount as budget, COALESCE(s.actual, 0) as actual
+    FROM goals g
+    LEFT JOIN spent s ON s.category = g.category
+    UNION ALL
+    SELECT s.category, NULL as budget, s.actual
+    FROM spent s
+    WHERE s.category NOT IN (SELECT category FROM goals)
+"""
+
+SQL_SELECT_CACHE_GENERATION = "SELECT generation FROM cache_generations WHERE user_id = ?"
+
+SQL_BUMP_CACHE_GENERATION = """
+    INSERT INTO cache_generations (user_id, generation) VALUES (?, 1)
+    ON CONFLICT(user_id) DO UPDATE SET generation = generation + 1
+"""
+
 # Database functions
+def rows_to_payload(rows, columns, columnar: bool = False):
+    """Shape query rows for a response, either as records or as one shared key list plus row arrays"""
+    if columnar:
+        return {"columns": columns, "rows": [tuple(row) for row in rows]}
+    return [dict(zip(columns, row)) for row in rows]
+
 def create_transaction(transaction: Transaction, user_id: str = "default_user"):
     """Create a new transaction in the database"""
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO transactions (user_id, type, category, amount, description, date)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (user_id, transaction.type.value, transaction.category, transaction.amount, 
-              transaction.description, transaction.date))
-        conn.commit()
+        with conn:
+            cursor = conn.execute(SQL_INSERT_TRANSACTION, (
+                user_id, transaction.type.value, transaction.category, transaction.amount,
+                transaction.description, transaction.date
+            ))
+            conn.execute(SQL_BUMP_CACHE_GENERATION, (user_id,))
         return cursor.lastrowid
 
+def create_transactions(transactions: List[Transaction], user_id: str = "default_user"):
+    """Insert many transactions in a single database transaction"""
+    rows = [(user_id, t.type.value, t.category, t.amount, t.description, t.date) for t in transactions]
+    with get_db() as conn:
+        with conn:
+            conn.executemany(SQL_INSERT_TRANSACTION, rows)
+            conn.execute(SQL_BUMP_CACHE_GENERATION, (user_id,))
+        return len(rows)
+
 def get_transactions(user_id: str = "default_user", limit: int = 100):
     """Get transactions for a user"""
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT * FROM transactions 
-            WHERE user_id = ? 
-            ORDER BY date DESC, created_at DESC 
-            LIMIT ?
-        """, (user_id, limit))
-        return cursor.fetchall()
+        return conn.execute(SQL_SELECT_TRANSACTIONS, (user_id, limit)).fetchall()
 
 def get_budget_goals(user_id: str = "default_user", month: int = None, year: int = None):
     """Get budget goals for a user"""
     with get_db() as conn:
-        cursor = conn.cursor()
         if month and year:
-            cursor.execute("""
-                SELECT * FROM budget_goals 
-                WHERE user_id = ? AND month = ? AND year = ?
-            """, (user_id, month, year))
-        else:
-            cursor.execute("""
-                SELECT * FROM budget_goals 
-                WHERE user_id = ?
-            """, (user_id,))
-        return cursor.fetchall()
+            return conn.execute(SQL_SELECT_BUDGET_GOALS_FOR_MONTH, (user_id, month, year)).fetchall()
+        return conn.execute(SQL_SELECT_BUDGET_GOALS, (user_id,)).fetchall()
 
 def set_budget_goal(budget_goal: BudgetGoal, user_id: str = "default_user"):
     """Set or update a budget goal"""
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO budget_goals (user_id, category, amount, month, year)
-            VALUES (?, ?, ?, ?, ?)
-        """, (user_id, budget_goal.category, budget_goal.amount, 
-              budget_goal.month, budget_goal.year))
-        conn.commit()
+        with conn:
+            conn.execute(SQL_UPSERT_BUDGET_GOAL, (
+                user_id, budget_goal.category, budget_goal.amount,
+                budget_goal.month, budget_goal.year
+            ))
+            conn.execute(SQL_BUMP_CACHE_GENERATION, (user_id,))
 
 # AI functions
-def generate_financial_advice(transactions_data: List[Dict], budget_goals: Dict = None, user_context: str = None):
+ADVICE_MAX_TRANSACTIONS = 200
+ADVICE_PROMPT_TOKEN_BUDGET = 8000
+
+ADVICE_PROMPT_TEMPLATE = """
+You are a professional financial advisor. Analyze the following financial data and provide personalized advice.
+
+TRANSACTION DATA:
+"recent" lists the latest transactions as t=type, c=category, a=amount, d=date.
+"older_totals" and "totals" give amounts summed per type and category.
+"history_summary", when present, summarizes every stored transaction.
+{tx}
+
+BUDGET GOALS:
+{bg}
+
+USER CONTEXT:
+{ctx}
+
+Please provide:
+1. Overall financial health assessment
+2. Spending pattern analysis
+3. Specific recommendations for improvement
+4. Budget suggestions
+5. Savings opportunities
+6. Warning about any concerning trends
+
+Keep the advice practical, actionable, and encouraging. Format your response in a clear, easy-to-read manner.
+"""
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for prompt sizing (about four characters per token)"""
+    return len(text) // 4
+
+def compact_transactions(transactions: List[Dict]) -> List[Dict]:
+    """Project transactions to short keys: type, category, amount, date"""
+    return [
+        {"t": t.get('type'), "c": t.get('category'), "a": t.get('amount'), "d": t.get('date')}
+        for t in transactions
+    ]
+
+# Client transactions are free-form dicts, so values are normalized before use
+def group_label(value) -> Optional[str]:
+    """Turn a type or category value into a usable dict key"""
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(",", ":"))
+
+def parse_amount(value) -> float:
+    """Read an amount as a finite float, counting anything else as zero"""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return amount if math.isfinite(amount) else 0.0
+
+def aggregate_transactions(transactions: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """Total transaction amounts per type and category"""
+    totals = {}
+    for t in transactions:
+        by_category = totals.setdefault(group_label(t.get('type')), {})
+        category = group_label(t.get('category'))
+        by_category[category] = by_category.get(category, 0) + parse_amount(t.get('amount'))
+    return totals
+
+def build_transaction_payload(transactions: List[Dict], history_summary: Optional[FinancialSummary] = None) -> str:
+    """Serialize transactions compactly, keeping prompt size bounded"""
+    recent = sorted(transactions, key=lambda t: str(t.get('date') or ''), reverse=True)
+    payload = {"recent": compact_transactions(recent[:ADVICE_MAX_TRANSACTIONS])}
+    if len(recent) > ADVICE_MAX_TRANSACTIONS:
+        payload["older_totals"] = aggregate_transactions(recent[ADVICE_MAX_TRANSACTIONS:])
+    if history_summary is not None:
+        payload["history_summary"] = history_summary.model_dump()
+    payload_json = json.dumps(payload, separators=(",", ":"))
+    
+    # Fall back to totals only when the itemised form would exceed the budget
+    if estimate_tokens(payload_json) > ADVICE_PROMPT_TOKEN_BUDGET:
+        payload = {"totals": aggregate_transactions(transactions)}
+        if history_summary is not None:
+            payload["history_summary"] = history_summary.model_dump()
+        payload_json = json.dumps(payload, separators=(",", ":"))
+    return payload_json
+
+gemini_semaphore = asyncio.Semaphore(WORKER_GEMINI_MAX_CONCURRENCY)
+gemini_token_lock = asyncio.Lock()
+gemini_token_window = deque()
+
+async def reserve_gemini_tokens(tokens: int):
+    """Wait until the rolling 60s token window has room for this prompt"""
+    async with gemini_token_lock:
+        while True:
+            now = time.monotonic()
+            while gemini_token_window and now - gemini_token_window[0][0] >= 60:
+                gemini_token_window.popleft()
+            used = sum(count for _, count in gemini_token_window)
+            if not gemini_token_window or used + tokens <= WORKER_GEMINI_TOKENS_PER_MINUTE:
+                gemini_token_window.append((now, tokens))
+                return
+            await asyncio.sleep(60 - (now - gemini_token_window[0][0]))
+
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=1, max=8),
+    retry=retry_if_exception_type((ResourceExhausted, ServerError)),
+    reraise=True
+)
+async def send_gemini_prompt(prompt: str):
+    """Send a prompt to Gemini, retrying quota and server errors with backoff"""
+    async with gemini_semaphore:
+        return await asyncio.to_thread(get_gemini_model().generate_content, prompt)
+
+async def request_gemini_completion(prompt: str):
+    """Reserve the prompt's tokens once, then send it with retries"""
+    await reserve_gemini_tokens(estimate_tokens(prompt))
+    return await send_gemini_prompt(prompt)
+
+async def generate_financial_advice(transactions_data: List[Dict], budget_goals: Dict = None, user_context: str = None,
+                                    history_summary: Optional[FinancialSummary] = None):
     """Generate financial advice using Gemini API"""
     try:
-        model = genai.GenerativeModel('gemini-pro')
-        
         # Prepare the prompt
-        prompt = f"""
-        You are a professional financial advisor. Analyze the following financial data and provide personalized advice.
-
-        TRANSACTION DATA:
-        {json.dumps(transactions_data, indent=2)}
-
-        BUDGET GOALS:
-        {json.dumps(budget_goals, indent=2) if budget_goals else "No budget goals set"}
-
-        USER CONTEXT:
-        {user_context if user_context else "No additional context provided"}
-
-        Please provide:
-        1. Overall financial health assessment
-        2. Spending pattern analysis
-        3. Specific recommendations for improvement
-        4. Budget suggestions
-        5. Savings opportunities
-        6. Warning about any concerning trends
-
-        Keep the advice practical, actionable, and encouraging. Format your response in a clear, easy-to-read manner.
-        """
+        prompt = ADVICE_PROMPT_TEMPLATE.format(
+            tx=build_transaction_payload(transactions_data, history_summary),
+            bg=json.dumps(budget_goals, separators=(",", ":")) if budget_goals else "No budget goals set",
+            ctx=user_context if user_context else "No additional context provided"
+        )
         
-        response = model.generate_content(prompt)
+        response = await request_gemini_completion(prompt)
         return response.text
         
+    except ResourceExhausted as e:
+        logger.error(f"Gemini quota exhausted: {str(e)}")
+        raise HTTPException(status_code=429, detail="AI advice is temporarily rate limited, please retry shortly")
     except Exception as e:
         logger.error(f"Error generating AI advice: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate AI advice")
 
-def calculate_financial_summary(transactions: List[Dict]) -> FinancialSummary:
-    """Calculate financial summary from transactions"""
-    total_income = sum(t['amount'] for t in transactions if t['type'] == 'income')
-    total_expenses = sum(t['amount'] for t in transactions if t['type'] == 'expense')
-    net_balance = total_income - total_expenses
-    
-    # Calculate expenses by category
-    expenses_by_category = {}
-    for t in transactions:
-        if t['type'] == 'expense':
-            expenses_by_category[t['category']] = expenses_by_category.get(t['category'], 0) + t['amount']
+def calculate_financial_summary(user_id: str = "default_user", limit: Optional[int] = 100) -> FinancialSummary:
+    """Calculate financial summary over a user's most recent transactions, or all of them when limit is None"""
+    if limit is None:
+        limit = -1  # SQLite treats a negative LIMIT as no limit
+    with get_db() as conn:
+        # Totals by transaction type
+        rows = conn.execute(SQL_SUMMARY_TOTALS, (user_id, limit)).fetchall()
+        totals = {row['type']: row['total'] for row in rows}
+        
+        # Expenses by category
+        rows = conn.execute(SQL_SUMMARY_EXPENSES_BY_CATEGORY, (user_id, limit)).fetchall()
+        expenses_by_category = {row['category']: row['total'] for row in rows}
     
+    total_income = totals.get('income', 0)
+    total_expenses = totals.get('expense', 0)
+    net_balance = total_income - total_expenses
     savings_rate = (net_balance / total_income * 100) if total_income > 0 else 0
     
     return FinancialSummary(
@@ -233,16 +655,23 @@ def calculate_financial_summary(transactions: List[Dict]) -> FinancialSummary:
 @app.on_event("startup")
 async def startup_event():
     """Initialize database on startup"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
     init_database()
+    init_db_pool()
     logger.info("Database initialized")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close pooled database connections on shutdown"""
+    close_db_pool()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
     return {"message": "AI Personal Finance Tracker API", "version": "1.0.0"}
 
 @app.post("/transactions/", response_model=dict)
-async def create_transaction_endpoint(transaction: Transaction):
+def create_transaction_endpoint(transaction: Transaction):
     """Create a new transaction"""
     try:
         transaction_id = create_transaction(transaction)
@@ -251,26 +680,36 @@ async def create_transaction_endpoint(transaction: Transaction):
         logger.error(f"Error creating transaction: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create transaction")
 
-@app.get("/transactions/", response_model=List[dict])
-async def get_transactions_endpoint(limit: int = 100):
+@app.post("/transactions/bulk/", response_model=dict)
+def create_transactions_bulk_endpoint(transactions: List[Transaction]):
+    """Create many transactions at once"""
+    try:
+        created = create_transactions(transactions)
+        return {"created": created, "message": "Transactions created successfully"}
+    except Exception as e:
+        logger.error(f"Error creating transactions: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to create transactions")
+
+@app.get("/transactions/")
+def get_transactions_endpoint(limit: int = 100, columnar: bool = False):
     """Get all transactions"""
     try:
         transactions = get_transactions(limit=limit)
-        return [dict(row) for row in transactions]
+        return ORJSONResponse(rows_to_payload(transactions, TRANSACTION_COLUMNS, columnar))
     except Exception as e:
         logger.error(f"Error fetching transactions: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch transactions")
 
 @app.delete("/transactions/{transaction_id}")
-async def delete_transaction(transaction_id: int):
+def delete_transaction(transaction_id: int):
     """Delete a transaction"""
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM transactions WHERE id = ?", (transaction_id,))
-            if cursor.rowcount == 0:
-                raise HTTPException(status_code=404, detail="Transaction not found")
-            conn.commit()
+            with conn:
+                cursor = conn.execute(SQL_DELETE_TRANSACTION, (transaction_id,))
+                if cursor.rowcount == 0:
+                    raise HTTPException(status_code=404, detail="Transaction not found")
+                conn.execute(SQL_BUMP_CACHE_GENERATION, ("default_user",))
         return {"message": "Transaction deleted successfully"}
     except HTTPException:
         raise
@@ -279,19 +718,23 @@ async def delete_transaction(transaction_id: int):
         raise HTTPException(status_code=500, detail="Failed to delete transaction")
 
 @app.get("/summary/", response_model=FinancialSummary)
-async def get_financial_summary():
+def get_financial_summary():
     """Get financial summary"""
     try:
-        transactions = get_transactions()
-        transactions_data = [dict(row) for row in transactions]
-        summary = calculate_financial_summary(transactions_data)
+        user_id = "default_user"
+        limit = 100
+        cache_key = (user_id, limit, get_data_generation(user_id))
+        summary = cache_get(summary_cache, cache_key)
+        if summary is None:
+            summary = calculate_financial_summary(user_id=user_id, limit=limit)
+            cache_set(summary_cache, cache_key, summary)
         return summary
     except Exception as e:
         logger.error(f"Error calculating summary: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to calculate financial summary")
 
 @app.post("/budget-goals/", response_model=dict)
-async def set_budget_goal_endpoint(budget_goal: BudgetGoal):
+def set_budget_goal_endpoint(budget_goal: BudgetGoal):
     """Set or update a budget goal"""
     try:
         set_budget_goal(budget_goal)
@@ -300,12 +743,12 @@ async def set_budget_goal_endpoint(budget_goal: BudgetGoal):
         logger.error(f"Error setting budget goal: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to set budget goal")
 
-@app.get("/budget-goals/", response_model=List[dict])
-async def get_budget_goals_endpoint(month: int = None, year: int = None):
+@app.get("/budget-goals/")
+def get_budget_goals_endpoint(month: int = None, year: int = None, columnar: bool = False):
     """Get budget goals"""
     try:
         goals = get_budget_goals(month=month, year=year)
-        return [dict(row) for row in goals]
+        return ORJSONResponse(rows_to_payload(goals, BUDGET_GOAL_COLUMNS, columnar))
     except Exception as e:
         logger.error(f"Error fetching budget goals: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch budget goals")
@@ -314,102 +757,107 @@ async def get_budget_goals_endpoint(month: int = None, year: int = None):
 async def get_ai_advice(request: AIAdviceRequest):
     """Get AI-powered financial advice"""
     try:
-        advice = generate_financial_advice(
-            transactions_data=request.transactions,
-            budget_goals=request.budget_goals,
-            user_context=request.user_context
-        )
+        transactions = request.transactions
+        use_stored_history = transactions is None
+        cache_source = request.model_dump_json()
+        if use_stored_history:
+            # Advice over stored data must be recomputed once that data changes
+            generation = await asyncio.to_thread(get_data_generation)
+            cache_source += f":{generation}"
+        cache_key = hashlib.sha256(cache_source.encode()).hexdigest()
+        advice = cache_get(ai_advice_cache, cache_key)
+        if advice is None:
+            history_summary = None
+            if use_stored_history:
+                # No client payload: send the latest stored rows, plus SQL totals
+                # over the whole history so older transactions are not ignored
+                rows = await asyncio.to_thread(get_transactions, limit=ADVICE_MAX_TRANSACTIONS)
+                transactions = [dict(row) for row in rows]
+                history_summary = await asyncio.to_thread(calculate_financial_summary, limit=None)
+            advice = await generate_financial_advice(
+                transactions_data=transactions,
+                budget_goals=request.budget_goals,
+                user_context=request.user_context,
+                history_summary=history_summary
+            )
+            cache_set(ai_advice_cache, cache_key, advice)
         return {"advice": advice}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating AI advice: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate AI advice")
 
 @app.get("/analytics/spending-trends/", response_model=dict)
-async def get_spending_trends():
+def get_spending_trends():
     """Get spending trends analytics"""
     try:
+        user_id = "default_user"
+        today = date.today()
+        six_months_ago = months_ago(today, 6).isoformat()
+        thirty_days_ago = (today - timedelta(days=30)).isoformat()
+        
+        cache_key = (user_id, today, get_data_generation(user_id))
+        cached = cache_get(spending_trends_cache, cache_key)
+        if cached is not None:
+            return cached
+        
         with get_db() as conn:
-            cursor = conn.cursor()
-            
             # Monthly spending trends
-            cursor.execute("""
-                SELECT 
-                    strftime('%Y-%m', date) as month,
-                    SUM(CASE WHEN type = 'income' THEN amount ELSE 0 END) as income,
-                    SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) as expenses
-                FROM transactions
-                WHERE date >= date('now', '-6 months')
-                GROUP BY strftime('%Y-%m', date)
-                ORDER BY month
-            """)
-            monthly_trends = [dict(row) for row in cursor.fetchall()]
+            rows = conn.execute(SQL_MONTHLY_TRENDS, (user_id, six_months_ago)).fetchall()
+            monthly_trends = [dict(row) for row in rows]
             
             # Category spending trends
-            cursor.execute("""
-                SELECT 
-                    category,
-                    SUM(amount) as total_amount,
-                    COUNT(*) as transaction_count,
-                    AVG(amount) as avg_amount
-                FROM transactions
-                WHERE type = 'expense' AND date >= date('now', '-30 days')
-                GROUP BY category
-                ORDER BY total_amount DESC
-            """)
-            category_trends = [dict(row) for row in cursor.fetchall()]
+            rows = conn.execute(SQL_CATEGORY_TRENDS, (user_id, thirty_days_ago)).fetchall()
+            category_trends = [dict(row) for row in rows]
             
             # Daily spending pattern
-            cursor.execute("""
-                SELECT 
-                    strftime('%w', date) as day_of_week,
-                    AVG(amount) as avg_spending
-                FROM transactions
-                WHERE type = 'expense' AND date >= date('now', '-30 days')
-                GROUP BY strftime('%w', date)
-                ORDER BY day_of_week
-            """)
-            daily_patterns = [dict(row) for row in cursor.fetchall()]
+            rows = conn.execute(SQL_DAILY_PATTERNS, (user_id, thirty_days_ago)).fetchall()
+            daily_patterns = [dict(row) for row in rows]
             
-        return {
+        trends = {
             "monthly_trends": monthly_trends,
             "category_trends": category_trends,
             "daily_patterns": daily_patterns
         }
+        cache_set(spending_trends_cache, cache_key, trends)
+        return trends
     except Exception as e:
         logger.error(f"Error fetching spending trends: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch spending trends")
 
 @app.get("/analytics/budget-performance/", response_model=dict)
-async def get_budget_performance():
+def get_budget_performance():
     """Get budget performance analytics"""
     try:
+        user_id = "default_user"
         current_month = datetime.now().month
         current_year = datetime.now().year
+        month_start, next_month_start = month_bounds(current_year, current_month)
         
-        # Get budget goals for current month
-        budget_goals = get_budget_goals(month=current_month, year=current_year)
-        budget_dict = {goal['category']: goal['amount'] for goal in budget_goals}
+        cache_key = (user_id, current_month, current_year, get_data_generation(user_id))
+        cached = cache_get(budget_performance_cache, cache_key)
+        if cached is not None:
+            return cached
         
-        # Get actual spending for current month
+        # Join current month goals with aggregated spending in one statement;
+        # spending in categories without a goal comes back with a NULL budget
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT 
-                    category,
-                    SUM(amount) as actual_spending
-                FROM transactions
-                WHERE type = 'expense' 
-                    AND strftime('%m', date) = ? 
-                    AND strftime('%Y', date) = ?
-                GROUP BY category
-            """, (f"{current_month:02d}", str(current_year)))
-            
-            actual_spending = {row['category']: row['actual_spending'] for row in cursor.fetchall()}
+            rows = conn.execute(SQL_BUDGET_PERFORMANCE, (
+                user_id, month_start.isoformat(), next_month_start.isoformat(),
+                user_id, current_month, current_year
+            )).fetchall()
         
         # Calculate performance metrics
         performance = []
-        for category, budget in budget_dict.items():
-            actual = actual_spending.get(category, 0)
+        total_budget = 0
+        total_spent = 0
+        for row in rows:
+            category, budget, actual = row['category'], row['budget'], row['actual']
+            total_spent += actual
+            if budget is None:
+                continue
+            total_budget += budget
             performance.append({
                 "category": category,
                 "budget": budget,
@@ -419,12 +867,14 @@ async def get_budget_performance():
                 "status": "over_budget" if actual > budget else "within_budget"
             })
         
-        return {
+        result = {
             "budget_performance": performance,
-            "total_budget": sum(budget_dict.values()),
-            "total_spent": sum(actual_spending.values()),
-            "overall_status": "within_budget" if sum(actual_spending.values()) <= sum(budget_dict.values()) else "over_budget"
+            "total_budget": total_budget,
+            "total_spent": total_spent,
+            "overall_status": "within_budget" if total_spent <= total_budget else "over_budget"
         }
+        cache_set(budget_performance_cache, cache_key, result)
+        return result
     except Exception as e:
         logger.error(f"Error fetching budget performance: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch budget performance")
@@ -434,6 +884,23 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now().isoformat()}
 
+@app.get("/pool-health")
+async def pool_health():
+    """Database connection pool health"""
+    idle = db_pool.qsize() if db_pool is not None else 0
+    size = db_pool.maxsize if db_pool is not None else 0
+    return {"size": size, "active": size - idle, "idle": idle}
+
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Worker processes inherit this and split the Gemini quota between them
+    os.environ["FINANCE_TRACKER_SERVER_PROCESSES"] = str(UVICORN_WORKERS)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=UVICORN_WORKERS,
+        loop=UVICORN_LOOP,
+        http=UVICORN_HTTP,
+        log_level="warning"
+    )
\ No newline at end of file